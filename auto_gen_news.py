@@ -1,9 +1,22 @@
 import os
 import re
+import asyncio
 import sys
 import json
+import io
+import shelve
+import hashlib
+import shutil
+import mimetypes
+from urllib.parse import urlparse
 import requests
+import requests_cache
+import httpx
 import openai
+from openai import AsyncOpenAI
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
 ###############################################################################
 # 1. CONFIGURATION: API KEYS AND ENDPOINTS
@@ -20,203 +33,446 @@ WP_BLOG_ID = "241913052"
 if not all([NEWS_API_KEY, OPENAI_API_KEY, WP_ACCESS_TOKEN]):
     raise ValueError("Error: One or more required API keys are missing. Check environment variables.")
 
-# Configure OpenAI API
-openai.api_key = OPENAI_API_KEY
+# Configure OpenAI API (async client so rewrites for several articles can overlap)
+# (its built-in retries are off; _retry_transient below handles them)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0)
 
 # WordPress REST API Endpoints
 WP_MEDIA_URL = f"https://public-api.wordpress.com/rest/v1/sites/{WP_BLOG_ID}/media/new"
 WP_POSTS_URL = f"https://public-api.wordpress.com/rest/v1/sites/{WP_BLOG_ID}/posts/new"
+WP_POST_URL = f"https://public-api.wordpress.com/rest/v1/sites/{WP_BLOG_ID}/posts/{{post_id}}"
+WP_MEDIA_ITEM_URL = f"https://public-api.wordpress.com/rest/v1/sites/{WP_BLOG_ID}/media/{{media_id}}"
 
 # Common headers for WordPress
 WP_HEADERS = {
     "Authorization": f"Bearer {WP_ACCESS_TOKEN}"
 }
 
+# Maximum number of articles processed concurrently (bounded for API rate limits)
+MAX_ARTICLE_WORKERS = 6
+
+# HTTP statuses worth retrying (rate limiting or temporary server trouble)
+TRANSIENT_STATUSES = (429, 500, 502, 503, 504)
+
+# Shared HTTP session so connections to newsapi.org and image hosts are kept
+# alive and reused instead of re-doing the TCP/TLS handshake per call
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    # No adapter-level retries: tenacity (_retry_transient) is the single retry
+    # layer for connection errors, timeouts and 429/5xx responses, so attempts
+    # don't multiply and 429/5xx reach raise_for_status instead of a RetryError
+    max_retries=0
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# On-disk caches so re-runs within a short window (e.g. CI retries) skip repeat API calls
+CACHE_DIR = ".cache"
+REWRITE_CACHE_PATH = os.path.join(CACHE_DIR, "rewrites")
+
+# NewsAPI responses are cached for 30 minutes; other hosts go through SESSION uncached.
+# apiKey is left out of cache keys and redacted from stored responses, since the
+# cache file is persisted to the Actions cache.
+NEWS_SESSION = requests_cache.CachedSession(
+    os.path.join(CACHE_DIR, "newsapi"),
+    backend="sqlite",
+    expire_after=1800,
+    ignored_parameters=["apiKey"]
+)
+NEWS_SESSION.mount("https://", _adapter)
+
+
+def _raise_for_transient_status(resp, statuses=TRANSIENT_STATUSES):
+    """
+    Raises an HTTP error (requests' or httpx's, matching 'resp') if 'resp' has a
+    status in 'statuses', so the retry decorators below can back off and try again.
+    """
+    if resp.status_code in statuses:
+        message = f"Transient HTTP {resp.status_code}"
+        if isinstance(resp, httpx.Response):
+            raise httpx.HTTPStatusError(message, request=resp.request, response=resp)
+        raise requests.exceptions.HTTPError(message, response=resp)
+
+
+def _is_transient(exc):
+    """
+    Returns True for network, HTTP and OpenAI errors that are worth retrying.
+    Deterministic failures (bad URLs, bad JSON, redirect loops, or the adapter's
+    own RetryError once it has given up) are not retried.
+    """
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError):
+        return exc.response is not None and exc.response.status_code in TRANSIENT_STATUSES
+    return isinstance(exc, (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError
+    ))
+
+
+def _is_safe_to_resend(exc):
+    """
+    Stricter variant of _is_transient for non-idempotent WordPress calls (media
+    uploads and post creation): only retry when the request can't have been
+    processed by the server.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429
+    return isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+
+
+def _is_transient_wp(exc):
+    """
+    Returns True for WordPress errors worth retrying on idempotent calls
+    (updating or deleting an existing post/attachment): transient statuses and
+    any transport failure, including read timeouts.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in TRANSIENT_STATUSES
+    return isinstance(exc, httpx.TransportError)
+
+
+# Bounded exponential backoff with jitter for transient NewsAPI/OpenAI/WP failures
+_retry_transient = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=1, max=10),
+    retry=retry_if_exception(_is_transient),
+    reraise=True
+)
+_retry_post = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=1, max=10),
+    retry=retry_if_exception(_is_safe_to_resend),
+    reraise=True
+)
+_retry_idempotent = retry(
+    stop=stop_after_attempt(4),
+    wait=wait_exponential_jitter(initial=1, max=10),
+    retry=retry_if_exception(_is_transient_wp),
+    reraise=True
+)
+
 ###############################################################################
 # 2. FETCH NEWS ARTICLES (Finance, Business, Tech)
 ###############################################################################
 
-def fetch_top_headlines():
+# (category name, NewsAPI params specific to that category)
+CATEGORIES = [
+    ("finance", {"q": "finance"}),  # Finance is simulated via a query
+    ("business", {"category": "business"}),
+    ("tech", {"category": "technology"}),
+]
+
+@_retry_transient
+def _fetch(params):
+    """
+    Issues a single NewsAPI top-headlines request and returns its list of articles.
+    This is the unit of work submitted to the executor in iter_headlines.
+    Raises requests.exceptions.RequestException on failure.
     """
-    Fetch the top 2 headlines from each of three news categories/topics:
+    resp = NEWS_SESSION.get(NEWS_API_URL, params=params, timeout=15)
+    resp.raise_for_status()
+    cache_status = "HIT" if getattr(resp, "from_cache", False) else "MISS"
+    print(f"[CACHE] NewsAPI {cache_status}: {params.get('category') or params.get('q')}")
+    data = resp.json()
+    return data.get("articles", []) or []
+
+
+def iter_headlines():
+    """
+    Fetch the top 2 headlines from each category/topic in CATEGORIES:
       1) Finance (simulated via 'q=finance')
       2) Business (category=business)
       3) Tech (category=technology)
 
-    Returns:
-        dict: { "finance": [...], "business": [...], "tech": [...] }
+    Yields:
+        tuple: (category, idx, article) for each article, in CATEGORIES order,
+        as soon as that category's request has completed.
     """
-    results = {
-        "finance": [],
-        "business": [],
-        "tech": []
-    }
-
-    # -- Finance (via query) --
-    finance_params = {
-        "country": "us",
-        "q": "finance",
-        "pageSize": 2,
-        "apiKey": NEWS_API_KEY
-    }
-    try:
-        resp = requests.get(NEWS_API_URL, params=finance_params, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        results["finance"] = data.get("articles", [])
-        print(f"[INFO] Fetched {len(results['finance'])} finance articles.")
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to get finance headlines: {e}")
-
-    # -- Business --
-    business_params = {
-        "country": "us",
-        "category": "business",
-        "pageSize": 2,
-        "apiKey": NEWS_API_KEY
-    }
-    try:
-        resp = requests.get(NEWS_API_URL, params=business_params, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        results["business"] = data.get("articles", [])
-        print(f"[INFO] Fetched {len(results['business'])} business articles.")
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to get business headlines: {e}")
-
-    # -- Tech --
-    tech_params = {
-        "country": "us",
-        "category": "technology",
-        "pageSize": 2,
-        "apiKey": NEWS_API_KEY
-    }
-    try:
-        resp = requests.get(NEWS_API_URL, params=tech_params, timeout=15)
-        resp.raise_for_status()
-        data = resp.json()
-        results["tech"] = data.get("articles", [])
-        print(f"[INFO] Fetched {len(results['tech'])} tech articles.")
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to get tech headlines: {e}")
-
-    # Optionally, if no articles are found at all, exit or handle accordingly
-    total_articles = sum(len(v) for v in results.values())
-    if total_articles == 0:
-        print("[INFO] No articles found for any category. Exiting.")
-        sys.exit(0)
-
-    return results
+    # The requests are independent, so fire them concurrently; wall time
+    # becomes the slowest single request rather than the sum of all of them.
+    # Results are still consumed in CATEGORIES order so that deduplication
+    # keeps a shared story in the same category regardless of network timing.
+    with ThreadPoolExecutor(max_workers=len(CATEGORIES)) as executor:
+        futures = []
+        for name, extra in CATEGORIES:
+            params = {"country": "us", "pageSize": 2, "apiKey": NEWS_API_KEY, **extra}
+            futures.append((name, executor.submit(_fetch, params)))
+        for category, future in futures:
+            try:
+                articles = future.result()
+            except requests.exceptions.RequestException as e:
+                print(f"[ERROR] Failed to get {category} headlines: {e}")
+                continue
+            print(f"[INFO] Fetched {len(articles)} {category} articles.")
+            for idx, article in enumerate(articles, start=1):
+                yield category, idx, article
 
 
 ###############################################################################
 # 3. REWRITE ARTICLE CONTENT USING OPENAI
 ###############################################################################
 
-def rewrite_article(title, description, content):
+REWRITE_MODEL = "gpt-4o-mini"
+REWRITE_MAX_TOKENS = 1100
+REWRITE_FALLBACK = "Error: Could not rewrite article using OpenAI API."
+REWRITE_PROMPT_TEMPLATE = (
+    "Please read the following article and rewrite it in an informative, "
+    "concise, and professional news-style format. **Do NOT restate the title "
+    "verbatim as the first line.** Instead, begin with a short introduction. "
+    "Use 400-700 words. Keep the essential details.\n\n"
+    "Title: {title}\n\n"
+    "Description: {description}\n\n"
+    "Content: {content}\n\n"
+    "Rewrite the article while keeping the key details."
+)
+
+# Matches a trailing " - ... " / " – ... " / " — ... " (usually the source name)
+_TITLE_TRAIL_RE = re.compile(r'\s[-–—]\s.*$')
+# Matches anything that isn't a word character or whitespace (for title fingerprints)
+_TITLE_PUNCT_RE = re.compile(r'[^\w\s]')
+
+
+def _clean_title(article):
+    """
+    Returns the article title with any trailing " - Source" style suffix removed.
+    """
+    title = article.get("title") or "No Title"
+    return _TITLE_TRAIL_RE.sub('', title)
+
+
+def _normalize_title(title):
+    """
+    Returns a lowercase, punctuation-free, whitespace-collapsed fingerprint of
+    'title' so the same story from different categories can be detected.
+    """
+    if title == "No Title":
+        return ""
+    return " ".join(_TITLE_PUNCT_RE.sub(" ", title.lower()).split())
+
+
+@_retry_transient
+async def _create_completion(prompt_text):
     """
-    Uses OpenAI (GPT-3.5-turbo) to rewrite the article in a professional news style.
-    Returns the rewritten text or a fallback message if there's an error.
+    Sends 'prompt_text' to OpenAI.
+    Returns (reply_text, finish_reason) with the reply stripped of whitespace.
     """
-    prompt_text = (
-        "Please read the following article and rewrite it in an informative, "
-        "concise, and professional news-style format. **Do NOT restate the title "
-        "verbatim as the first line.** Instead, begin with a short introduction. "
-        "Use 400-800 words (or ~1500 tokens). Keep the essential details.\n\n"
-        f"Title: {title}\n\n"
-        f"Description: {description}\n\n"
-        f"Content: {content}\n\n"
-        "Rewrite the article while keeping the key details."
+    response = await client.chat.completions.create(
+        model=REWRITE_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a professional news writer."},
+            {"role": "user", "content": prompt_text}
+        ],
+        temperature=0.7,
+        top_p=1,
+        presence_penalty=0,
+        # ~700 words plus headroom; generation time scales with output tokens
+        max_tokens=REWRITE_MAX_TOKENS
     )
+    choice = response.choices[0]
+    return choice.message.content.strip(), choice.finish_reason
+
+
+async def rewrite_article(title, description, content):
+    """
+    Uses OpenAI (REWRITE_MODEL) to rewrite the article in a professional news style.
+    Returns (rewritten_text, complete), where 'complete' is False if the reply
+    was cut off at REWRITE_MAX_TOKENS or the fallback message was used.
+    """
+    prompt_text = REWRITE_PROMPT_TEMPLATE.format(title=title, description=description, content=content)
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a professional news writer."},
-                {"role": "user", "content": prompt_text}
-            ],
-            temperature=0.7
-        )
-        rewritten_text = response.choices[0].message.content.strip()
-        return rewritten_text
+        rewritten_text, finish_reason = await _create_completion(prompt_text)
     except Exception as e:
         print(f"[ERROR] OpenAI API call failed: {e}")
-        return "Error: Could not rewrite article using OpenAI API."
+        return REWRITE_FALLBACK, False
+
+    if finish_reason == "length":
+        print(f"[WARN] Rewrite of '{title}' hit the {REWRITE_MAX_TOKENS}-token limit and may be truncated.")
+        return rewritten_text, False
+    return rewritten_text, True
+
+
+def _rewrite_cache_key(title, description, content):
+    """
+    Returns a SHA256 hex digest identifying the rewrite prompt inputs. The model,
+    token cap and prompt template are part of the key, so changing any of them
+    invalidates earlier rewrites.
+    """
+    parts = (REWRITE_MODEL, str(REWRITE_MAX_TOKENS), REWRITE_PROMPT_TEMPLATE, title, description, content)
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+async def rewrite_article_cached(cache, article):
+    """
+    Rewrites 'article', serving a previously rewritten copy of the same inputs
+    from the on-disk 'cache' (an open shelve) instead of calling OpenAI.
+    Returns the rewritten text (or the fallback message).
+    """
+    title = _clean_title(article)
+    description = article.get("description", "")
+    content = article.get("content", "")
+    cache_key = _rewrite_cache_key(title, description, content)
+    if cache_key in cache:
+        print(f"[CACHE] Rewrite HIT: '{title}'")
+        return cache[cache_key]
+
+    print(f"[CACHE] Rewrite MISS: '{title}'")
+    rewritten_text, complete = await rewrite_article(title, description, content)
+    if complete:
+        # Only cache complete rewrites so failures/truncations are retried next run
+        cache[cache_key] = rewritten_text
+    return rewritten_text
 
 
 ###############################################################################
-# 4. DOWNLOAD IMAGE LOCALLY
+# 4. DOWNLOAD IMAGE INTO MEMORY
 ###############################################################################
 
-def download_image(image_url, local_filename):
+# Custom headers to mimic a real browser request
+IMAGE_REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/100.0.4896.60 Safari/537.36"
+    ),
+    "Referer": "https://www.google.com/"
+}
+
+# File extensions for common image MIME types (mimetypes lacks some, e.g. webp on 3.9)
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/avif": ".avif",
+}
+
+
+def _extension_for(content_type):
     """
-    Downloads an image from 'image_url' and saves it to 'local_filename'.
-    Returns True on success, False on failure.
+    Returns a file extension for an image/* 'content_type', defaulting to .jpg
+    if it isn't an image type or has no known extension.
     """
-    if not image_url:
-        return False
+    if not content_type.startswith("image/"):
+        return ".jpg"
+    return IMAGE_EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ".jpg"
+
+
+def _image_content_type(header_value, image_url):
+    """
+    Returns the image MIME type to upload with. The server's Content-Type is
+    trusted when it is an image/* type (CDN URLs like ?format=webp lie about
+    their extension); otherwise it falls back to the URL's extension, then to
+    image/jpeg.
+    """
+    content_type = (header_value or "").split(";")[0].strip().lower()
+    if content_type.startswith("image/"):
+        return content_type
+    guessed, _ = mimetypes.guess_type(urlparse(image_url).path)
+    if guessed and guessed.startswith("image/"):
+        return guessed
+    return "image/jpeg"
 
-    # Custom headers to mimic a real browser request
-    headers_for_image = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/100.0.4896.60 Safari/537.36"
-        ),
-        "Referer": "https://www.google.com/"
-    }
 
+def image_is_fetchable(image_url):
+    """
+    Cheaply checks that 'image_url' resolves to an image, using a HEAD request
+    (or a one-byte ranged GET if the server doesn't allow HEAD).
+    Returns True if the image looks downloadable, False otherwise.
+    """
     try:
-        response = requests.get(image_url, headers=headers_for_image, timeout=15)
-        if response.status_code == 200:
-            with open(local_filename, "wb") as f:
-                f.write(response.content)
-            print(f"[INFO] Image downloaded successfully: {local_filename}")
-            return True
-        else:
+        resp = SESSION.head(image_url, headers=IMAGE_REQUEST_HEADERS, timeout=5, allow_redirects=True)
+        if resp.status_code == 405:
+            headers = {**IMAGE_REQUEST_HEADERS, "Range": "bytes=0-0"}
+            with SESSION.get(image_url, headers=headers, stream=True, timeout=5) as resp:
+                pass
+    except requests.exceptions.RequestException as e:
+        print(f"[WARN] Could not check image {image_url}: {e}")
+        return False
+
+    if resp.status_code >= 400:
+        print(f"[WARN] Image not reachable: HTTP {resp.status_code} for {image_url}")
+        return False
+    if not resp.headers.get("Content-Type", "").startswith("image/"):
+        print(f"[WARN] URL is not an image ({resp.headers.get('Content-Type')}): {image_url}")
+        return False
+    return True
+
+
+@_retry_transient
+def _get_image(image_url, headers):
+    """
+    Streams 'image_url' into an in-memory buffer.
+    Returns (fileobj, content_type), or (None, None) on a non-transient HTTP error.
+    """
+    with SESSION.get(image_url, headers=headers, stream=True, timeout=15) as response:
+        _raise_for_transient_status(response)
+        if response.status_code != 200:
             print(f"[WARN] Failed to download image. HTTP {response.status_code}")
-            return False
+            return None, None
+        content_type = _image_content_type(response.headers.get("Content-Type"), image_url)
+        # Let urllib3 undo any Content-Encoding, then copy socket -> buffer in chunks
+        response.raw.decode_content = True
+        fileobj = io.BytesIO()
+        shutil.copyfileobj(response.raw, fileobj, length=64 * 1024)
+
+    fileobj.seek(0)
+    return fileobj, content_type
+
+
+def download_image(image_url):
+    """
+    Downloads an image from 'image_url' into an in-memory buffer.
+    Returns (fileobj, content_type) on success, where content_type comes from the
+    response's Content-Type header when it is an image type (see
+    _image_content_type), or (None, None) on failure.
+    """
+    if not image_url:
+        return None, None
+
+    try:
+        fileobj, content_type = _get_image(image_url, IMAGE_REQUEST_HEADERS)
     except Exception as e:
         print(f"[ERROR] Exception while downloading {image_url}: {e}")
-        return False
+        return None, None
+    if fileobj is None:
+        return None, None
+
+    print(f"[INFO] Image downloaded successfully: {image_url}")
+    return fileobj, content_type
 
 
 ###############################################################################
-# 5. UPLOAD LOCAL IMAGE TO WORDPRESS
+# 5. UPLOAD IMAGE TO WORDPRESS
 ###############################################################################
 
-def upload_local_image(image_path):
+@_retry_post
+async def _post_media(wp_client, filename, fileobj, content_type):
     """
-    Uploads a local image file to WordPress media library.
-    Returns (attachment_id, media_link) on success, or (None, None) on failure.
+    Sends one multipart media upload to WordPress and returns the response.
     """
-    if not os.path.exists(image_path):
-        print(f"[WARN] File not found: {image_path}")
-        return None, None
-
-    filename = os.path.basename(image_path)
-    ext = os.path.splitext(filename)[1].lower()
-
-    # Determine the MIME type
-    if ext in [".jpg", ".jpeg"]:
-        content_type = "image/jpeg"
-    elif ext == ".png":
-        content_type = "image/png"
-    elif ext == ".gif":
-        content_type = "image/gif"
-    else:
-        content_type = "application/octet-stream"
+    # Rewind in case a previous attempt already consumed the buffer
+    fileobj.seek(0)
+    files = {
+        "media[]": (filename, fileobj, content_type)
+    }
+    resp = await wp_client.post(WP_MEDIA_URL, files=files)
+    _raise_for_transient_status(resp, statuses=(429,))
+    return resp
 
-    # Prepare the file for upload
-    with open(image_path, "rb") as f:
-        files = {
-            "media[]": (filename, f.read(), content_type)
-        }
 
+async def upload_local_image(wp_client, filename, fileobj, content_type):
+    """
+    Uploads an in-memory image to WordPress media library under 'filename'.
+    Returns (attachment_id, media_link) on success, or (None, None) on failure.
+    """
     try:
-        resp = requests.post(WP_MEDIA_URL, headers=WP_HEADERS, files=files, timeout=15)
-    except requests.exceptions.RequestException as e:
+        resp = await _post_media(wp_client, filename, fileobj, content_type)
+    except httpx.HTTPError as e:
         print(f"[ERROR] Failed to upload image to WordPress: {e}")
         return None, None
 
@@ -238,98 +494,278 @@ def upload_local_image(image_path):
     return attachment_id, media_link
 
 
+async def _download_and_upload(wp_client, image_url, basename):
+    """
+    Downloads 'image_url' into memory and uploads it to WordPress as 'basename'
+    plus an extension matching the downloaded Content-Type.
+    Returns (attachment_id, media_link) on success, or (None, None) on failure.
+    """
+    # The download still uses the blocking requests SESSION, so keep it off the event loop
+    fileobj, content_type = await asyncio.to_thread(download_image, image_url)
+    if fileobj is None:
+        print(f"[INFO] Failed to download image from {image_url}.")
+        return None, None
+    with fileobj:
+        return await upload_local_image(wp_client, basename + _extension_for(content_type), fileobj, content_type)
+
+
 ###############################################################################
 # 6. CREATE (OR PUBLISH) A WORDPRESS POST
 ###############################################################################
 
-def create_wordpress_post(title, content, attachment_id=None):
+@_retry_post
+async def _send_post(wp_client, url, post_data=None):
+    """
+    Sends one post-creation request to WordPress and returns the response.
+    """
+    resp = await wp_client.post(url, json=post_data)
+    _raise_for_transient_status(resp, statuses=(429,))
+    return resp
+
+
+@_retry_idempotent
+async def _send_update(wp_client, url, post_data=None):
+    """
+    Sends one update or delete request for an existing post/attachment to
+    WordPress and returns the response. Safe to repeat, so 5xx and timeouts
+    are retried too.
+    """
+    resp = await wp_client.post(url, json=post_data)
+    _raise_for_transient_status(resp)
+    return resp
+
+
+async def create_wordpress_post(wp_client, title, content, image_url):
     """
-    Creates a WordPress post with the given title and content, optionally setting
-    the featured image if attachment_id is provided. Uses the 'Daily' category.
+    Creates a draft WordPress post with the given title and content in the 'Daily'
+    category, asking WordPress to sideload 'image_url' as the featured image
+    (saves our own download + media upload when it works). The draft is only
+    published by publish_wordpress_post once it has a featured image.
+    Returns (post_id, has_featured_image), or (None, False) on failure.
     """
     post_data = {
         "title": title,
         "content": content,
-        "status": "publish",
-        "categories": ["Daily"]  # Example category
+        "status": "draft",
+        "categories": ["Daily"],  # Example category
+        # For WordPress.com REST v1, it's "featured_image" not "featured_media"
+        "featured_image": image_url
     }
+
+    try:
+        resp = await _send_post(wp_client, WP_POSTS_URL, post_data)
+    except httpx.HTTPError as e:
+        print(f"[ERROR] Failed to create post: {e}")
+        return None, False
+
+    if resp.status_code not in (200, 201):
+        # Never retry as a second posts/new; the post may already have been created
+        print(f"[ERROR] Failed to create post '{title}': HTTP {resp.status_code} - {resp.text}")
+        return None, False
+
+    # A failed sideload still creates the post, just with an empty featured image
+    post = resp.json()
+    has_featured_image = bool(post.get("featured_image") or post.get("post_thumbnail"))
+    print(f"[INFO] Draft post '{title}' created successfully! (ID {post.get('ID')})")
+    return post.get("ID"), has_featured_image
+
+
+async def publish_wordpress_post(wp_client, post_id, attachment_id=None):
+    """
+    Publishes a draft post, setting 'attachment_id' as its featured image in the
+    same update if provided. Returns True on success, False on failure.
+    """
+    post_data = {"status": "publish"}
     if attachment_id:
-        # For WordPress.com REST v1, it's "featured_image" not "featured_media"
         post_data["featured_image"] = attachment_id
 
     try:
-        resp = requests.post(WP_POSTS_URL, headers=WP_HEADERS, json=post_data, timeout=15)
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to create post: {e}")
+        resp = await _send_update(wp_client, WP_POST_URL.format(post_id=post_id), post_data)
+    except httpx.HTTPError as e:
+        print(f"[ERROR] Failed to publish post {post_id}: {e}")
         return False
 
-    if resp.status_code in (200, 201):
-        print(f"[INFO] Post '{title}' created successfully!")
-        return True
-    else:
-        print(f"[ERROR] Failed to create post '{title}': HTTP {resp.status_code} - {resp.text}")
+    if resp.status_code not in (200, 201):
+        print(f"[ERROR] Failed to publish post {post_id}: HTTP {resp.status_code} - {resp.text}")
+        return False
+    print(f"[INFO] Published post {post_id}" + (f" with image {attachment_id}." if attachment_id else "."))
+    return True
+
+
+async def delete_wordpress_post(wp_client, post_id):
+    """
+    Deletes (trashes) a post. Returns True on success, False on failure.
+    """
+    try:
+        resp = await _send_update(wp_client, WP_POST_URL.format(post_id=post_id) + "/delete")
+    except httpx.HTTPError as e:
+        print(f"[ERROR] Failed to delete post {post_id}: {e}")
+        return False
+
+    if resp.status_code not in (200, 201):
+        print(f"[ERROR] Failed to delete post {post_id}: HTTP {resp.status_code} - {resp.text}")
+        return False
+    print(f"[INFO] Deleted post {post_id}.")
+    return True
+
+
+async def delete_wordpress_media(wp_client, media_id):
+    """
+    Deletes an uploaded attachment from the media library.
+    Returns True on success, False on failure.
+    """
+    try:
+        resp = await _send_update(wp_client, WP_MEDIA_ITEM_URL.format(media_id=media_id) + "/delete")
+    except httpx.HTTPError as e:
+        print(f"[ERROR] Failed to delete media {media_id}: {e}")
+        return False
+
+    if resp.status_code not in (200, 201):
+        print(f"[ERROR] Failed to delete media {media_id}: HTTP {resp.status_code} - {resp.text}")
         return False
+    print(f"[INFO] Deleted media {media_id}.")
+    return True
 
 
 ###############################################################################
 # 7. MAIN WORKFLOW
 ###############################################################################
 
-def main():
-    # 1. Fetch the latest articles from NewsAPI (finance, business, tech)
-    headlines_by_category = fetch_top_headlines()
-
-    # 2. Iterate through each category, then each article
-    for category, articles in headlines_by_category.items():
-        for idx, article in enumerate(articles, start=1):
-            original_title = article.get("title") or "No Title"
-            # Clean up the title to remove any trailing " - ... " or " – ... "
-            original_title = re.sub(r'\s[-–—]\s.*$', '', original_title)
-
-            description = article.get("description", "")
-            content = article.get("content", "")
-            image_url = article.get("urlToImage", "")
-
-            # --- A) If there's no image URL at all, skip immediately ---
-            if not image_url:
-                print(f"[INFO] No image URL for article '{original_title}'. Skipping.")
-                continue
+async def process_article(wp_client, category, idx, article, rewritten_content):
+    """
+    Publishes the rewritten article, letting WordPress sideload the featured
+    image and falling back to download + upload + attach if that didn't work.
+    The post stays a draft until it has a featured image, so nothing goes live
+    (or reaches followers) without one.
+    Returns True if the post was published with a featured image, False otherwise.
+    """
+    original_title = _clean_title(article)
+    image_url = article.get("urlToImage", "")
 
-            # --- B) Rewrite Article with OpenAI ---
-            rewritten_content = rewrite_article(original_title, description, content)
+    # --- B) Create a draft and let WordPress fetch the image itself ---
+    post_id, has_featured_image = await create_wordpress_post(wp_client, original_title, rewritten_content, image_url)
+    if post_id is None:
+        return False
+    if has_featured_image:
+        attachment_id = None
+    else:
+        # --- C) Sideload didn't stick: upload the image ourselves ---
+        print(f"[INFO] WordPress could not sideload the image for '{original_title}'. Uploading it instead.")
+        attachment_id, _ = await _download_and_upload(wp_client, image_url, f"image_{category}_{idx}")
+        if not attachment_id:
+            print(f"[INFO] No attachment_id returned for '{original_title}'. Removing draft {post_id}.")
+            await delete_wordpress_post(wp_client, post_id)
+            return False
 
-            # --- C) Attempt to Download Image Locally ---
-            # Attempt to guess a file extension
-            ext = os.path.splitext(image_url)[1]
-            # If the URL doesn't have a valid extension or it's too long, default to .jpg
-            if not ext or len(ext) > 5:
-                ext = ".jpg"
+    # --- D) Publish, attaching the uploaded image in the same update ---
+    if await publish_wordpress_post(wp_client, post_id, attachment_id):
+        return True
 
-            local_filename = f"temp_image_{category}_{idx}{ext}"
-            downloaded_ok = download_image(image_url, local_filename)
-            if not downloaded_ok:
-                print(f"[INFO] Failed to download image for '{original_title}'. Skipping.")
-                continue
+    # Don't leave a draft or an orphaned attachment behind
+    print(f"[INFO] Could not publish '{original_title}'. Removing draft {post_id}.")
+    await delete_wordpress_post(wp_client, post_id)
+    if attachment_id:
+        await delete_wordpress_media(wp_client, attachment_id)
+    return False
 
-            # --- D) Upload the downloaded file to WordPress ---
-            attachment_id, _ = upload_local_image(local_filename)
-            # Clean up the temp file
-            try:
-                os.remove(local_filename)
-            except OSError:
-                pass
 
-            if not attachment_id:
-                print(f"[INFO] No attachment_id returned for '{original_title}'. Skipping.")
-                continue
+async def _run_pipeline():
+    """
+    Streams articles from iter_headlines() through the whole pipeline: filter,
+    image check, rewrite and publish. Each article holds one of
+    MAX_ARTICLE_WORKERS slots from its image check until its post is done, and
+    the next headline is only pulled once a slot is free. That keeps at most
+    MAX_ARTICLE_WORKERS rewrites/images in memory and bounds OpenAI and WP
+    concurrency for rate limits.
+    Returns the number of articles fetched from NewsAPI.
+    """
+    slots = asyncio.Semaphore(MAX_ARTICLE_WORKERS)
+    # Dedupe key (URL or title fingerprint) -> future of the latest copy of that
+    # story, resolving to True once the story has been published by it or an
+    # earlier copy. A story only counts as taken if it was actually published.
+    claims = {}
+    total_articles = 0
+    in_flight = set()
+    headlines = iter_headlines()
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with shelve.open(REWRITE_CACHE_PATH) as cache:
+        # HTTP/2 lets concurrent uploads and post creations share one TLS connection
+        async with httpx.AsyncClient(http2=True, headers=WP_HEADERS, timeout=15) as wp_client:
+
+            async def check_rewrite_and_publish(category, idx, article, earlier_claims, claim):
+                title = _clean_title(article)
+                post_created = False
+                story_published = False
+                try:
+                    # Wait on earlier copies of the same story (in CATEGORIES order);
+                    # only skip if one of them actually got published
+                    for earlier in earlier_claims:
+                        if await earlier:
+                            print(f"[INFO] Duplicate article '{title}' in category '{category}'. Skipping.")
+                            story_published = True
+                            return
+                    # Drop dead images before spending an OpenAI call on them
+                    if not await asyncio.to_thread(image_is_fetchable, article.get("urlToImage")):
+                        print(f"[INFO] Image unavailable for '{title}' in category '{category}'. Skipping.")
+                        return
+                    rewritten_content = await rewrite_article_cached(cache, article)
+                    post_created = await process_article(wp_client, category, idx, article, rewritten_content)
+                    story_published = post_created
+                except Exception as e:
+                    print(f"[ERROR] Unexpected failure processing '{title}' in category '{category}': {e}")
+                    return
+                finally:
+                    claim.set_result(story_published)
+                    slots.release()
+
+                if post_created:
+                    print(f"[INFO] Successfully published post for '{title}' in category '{category}'.")
+                else:
+                    print(f"[ERROR] Could not publish post for '{title}' in category '{category}'.")
+
+            while True:
+                await slots.acquire()
+                # iter_headlines blocks on NewsAPI requests, so step it off the event loop
+                item = await asyncio.to_thread(next, headlines, None)
+                if item is None:
+                    slots.release()
+                    break
+                total_articles += 1
+                category, idx, article = item
+
+                # If there's no image URL at all, skip before spending an OpenAI call on it
+                if not article.get("urlToImage"):
+                    print(f"[INFO] No image URL for article '{_clean_title(article)}'. Skipping.")
+                    slots.release()
+                    continue
+
+                # Chain this copy behind any earlier copy of the same story, so a
+                # duplicate is only skipped once an earlier one is published
+                keys = {k for k in (article.get("url"), _normalize_title(_clean_title(article))) if k}
+                earlier_claims = {claims[k] for k in keys if k in claims}
+                claim = asyncio.get_running_loop().create_future()
+                for k in keys:
+                    claims[k] = claim
+
+                task = asyncio.create_task(check_rewrite_and_publish(category, idx, article, earlier_claims, claim))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            await asyncio.gather(*in_flight)
+
+    return total_articles
+
 
-            # --- E) Create WordPress Post with the featured image ---
-            post_created = create_wordpress_post(original_title, rewritten_content, attachment_id)
-            if post_created:
-                print(f"[INFO] Successfully published post for '{original_title}' in category '{category}'.")
-            else:
-                print(f"[ERROR] Could not publish post for '{original_title}' in category '{category}'.")
+def main():
+    # Fetch, filter, rewrite and publish articles as one stream on a single event loop
+    total_articles = asyncio.run(_run_pipeline())
+
+    # Optionally, if no articles are found at all, exit or handle accordingly
+    if total_articles == 0:
+        print("[INFO] No articles found for any category. Exiting.")
+        sys.exit(0)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()